@@ -6,8 +6,16 @@ based on their watch history and TMDB similar content recommendations.
 
 import asyncio
 import aiohttp
+import heapq
+import ijson
+import itertools
 import os
 import logging
+import operator
+import orjson
+import sqlite3
+import threading
+import time
 from datetime import datetime
 from typing import Optional
 from dataclasses import dataclass
@@ -20,6 +28,19 @@ logging.basicConfig(
 logger = logging.getLogger('JellyfinSuggested')
 
 
+async def read_json(resp: aiohttp.ClientResponse):
+    """Decode a response body with orjson, which is much faster than stdlib json."""
+    return orjson.loads(await resp.read())
+
+
+def get_tmdb_id(item: dict) -> Optional[int]:
+    """Get the TMDB ID from a Jellyfin item's provider IDs, if it has one."""
+    try:
+        return int(item['ProviderIds']['Tmdb'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
 @dataclass
 class Config:
     """Configuration loaded from environment variables."""
@@ -33,6 +54,9 @@ class Config:
     min_tmdb_rating: float = 6.0
     min_tmdb_votes: int = 50
     request_timeout: int = 30
+    max_user_concurrency: int = 8
+    cache_dir: str = "/var/cache/jellyfin-suggested"
+    cache_ttl_days: int = 7
 
     @classmethod
     def from_env(cls) -> 'Config':
@@ -58,23 +82,57 @@ class Config:
             min_tmdb_rating=float(os.getenv('MIN_TMDB_RATING', '6.0')),
             min_tmdb_votes=int(os.getenv('MIN_TMDB_VOTES', '50')),
             request_timeout=int(os.getenv('REQUEST_TIMEOUT', '30')),
+            max_user_concurrency=int(os.getenv('MAX_USER_CONCURRENCY', '8')),
+            cache_dir=os.getenv('CACHE_DIR', '/var/cache/jellyfin-suggested'),
+            cache_ttl_days=int(os.getenv('CACHE_TTL_DAYS', '7')),
         )
 
 
+@dataclass(slots=True)
+class Suggestion:
+    """A library item suggested to a user, scored by its TMDB rating."""
+    id: str
+    name: str
+    type: str
+    score: float
+
+
+class JellyfinAuthError(Exception):
+    """Raised when Jellyfin rejects the configured API key."""
+
+
 class JellyfinClient:
     """Client for interacting with Jellyfin API."""
 
+    # Skip image and user data in /Items responses; callers only need IDs and names
+    MINIMAL_ITEM_PARAMS = {
+        'enableImages': 'false',
+        'enableUserData': 'false',
+        'enableImageTypes': ''
+    }
+
     def __init__(self, config: Config, session: aiohttp.ClientSession):
         self.config = config
         self.session = session
         self.headers = {'X-Emby-Token': config.jellyfin_api_key}
 
+    @staticmethod
+    def _check_auth(resp: aiohttp.ClientResponse, startup: bool = False):
+        """Fail fast when Jellyfin rejects the API key instead of returning empty results.
+
+        A 403 only means a bad key for the server-wide startup calls; elsewhere it
+        is a per-user permission issue and is handled like any other failure.
+        """
+        if resp.status == 401 or (startup and resp.status == 403):
+            raise JellyfinAuthError(f"Jellyfin rejected the API key: {resp.status}")
+
     async def get_users(self) -> list[dict]:
         """Get all Jellyfin users."""
         url = f"{self.config.jellyfin_url}/Users"
         async with self.session.get(url, headers=self.headers) as resp:
+            self._check_auth(resp, startup=True)
             if resp.status == 200:
-                return await resp.json()
+                return await read_json(resp)
             logger.error(f"Failed to get users: {resp.status}")
             return []
 
@@ -89,46 +147,71 @@ class JellyfinClient:
             'recursive': 'true',
             'includeItemTypes': media_type,
             'limit': self.config.max_watched_items,
-            'fields': 'ProviderIds'
+            'fields': 'ProviderIds',
+            **self.MINIMAL_ITEM_PARAMS
         }
         async with self.session.get(url, headers=self.headers, params=params) as resp:
+            self._check_auth(resp)
             if resp.status == 200:
-                data = await resp.json()
+                data = await read_json(resp)
                 return data.get('Items', [])
             logger.error(f"Failed to get watched items: {resp.status}")
             return []
 
-    async def get_library_items(self, media_type: str) -> dict[int, dict]:
-        """Get all items in library indexed by TMDB ID."""
+    async def get_library_items(self, media_type: str) -> dict[int, tuple[str, str]]:
+        """Get (Id, Name) of all items in library indexed by TMDB ID."""
         url = f"{self.config.jellyfin_url}/Items"
         params = {
             'recursive': 'true',
             'includeItemTypes': media_type,
-            'fields': 'ProviderIds'
+            'fields': 'ProviderIds',
+            **self.MINIMAL_ITEM_PARAMS
         }
         async with self.session.get(url, headers=self.headers, params=params) as resp:
+            self._check_auth(resp, startup=True)
             if resp.status == 200:
-                data = await resp.json()
+                # Stream the (potentially huge) response rather than buffering it
                 items = {}
-                for item in data.get('Items', []):
-                    tmdb_id = item.get('ProviderIds', {}).get('Tmdb')
-                    if tmdb_id:
-                        items[int(tmdb_id)] = item
+                async for item in ijson.items_async(resp.content, 'Items.item'):
+                    tmdb_id = get_tmdb_id(item)
+                    if tmdb_id is not None:
+                        items[tmdb_id] = (item['Id'], item.get('Name') or item['Id'])
                 return items
             logger.error(f"Failed to get library items: {resp.status}")
             return {}
 
+    async def get_items_by_ids(self, user_id: str, ids: list[str], fields: str = 'ProviderIds') -> list[dict]:
+        """Get multiple items by ID in a single request."""
+        if not ids:
+            return []
+        url = f"{self.config.jellyfin_url}/Items"
+        params = {
+            'userId': user_id,
+            'ids': ','.join(ids),
+            'fields': fields,
+            **self.MINIMAL_ITEM_PARAMS
+        }
+        async with self.session.get(url, headers=self.headers, params=params) as resp:
+            self._check_auth(resp)
+            if resp.status == 200:
+                data = await read_json(resp)
+                return data.get('Items', [])
+            logger.error(f"Failed to get items by ID: {resp.status}")
+            return []
+
     async def get_user_playlists(self, user_id: str) -> list[dict]:
         """Get playlists for a user."""
         url = f"{self.config.jellyfin_url}/Items"
         params = {
             'userId': user_id,
             'includeItemTypes': 'Playlist',
-            'recursive': 'true'
+            'recursive': 'true',
+            **self.MINIMAL_ITEM_PARAMS
         }
         async with self.session.get(url, headers=self.headers, params=params) as resp:
+            self._check_auth(resp)
             if resp.status == 200:
-                data = await resp.json()
+                data = await read_json(resp)
                 return data.get('Items', [])
             return []
 
@@ -142,8 +225,9 @@ class JellyfinClient:
             'mediaType': 'Mixed'
         }
         async with self.session.post(url, headers=self.headers, params=params) as resp:
+            self._check_auth(resp)
             if resp.status == 200:
-                data = await resp.json()
+                data = await read_json(resp)
                 return data.get('Id')
             logger.error(f"Failed to create playlist: {resp.status}")
             return None
@@ -153,8 +237,9 @@ class JellyfinClient:
         url = f"{self.config.jellyfin_url}/Playlists/{playlist_id}/Items"
         params = {'userId': user_id}
         async with self.session.get(url, headers=self.headers, params=params) as resp:
+            self._check_auth(resp)
             if resp.status == 200:
-                data = await resp.json()
+                data = await read_json(resp)
                 return data.get('Items', [])
             return []
 
@@ -165,6 +250,7 @@ class JellyfinClient:
         url = f"{self.config.jellyfin_url}/Playlists/{playlist_id}/Items"
         params = {'entryIds': ','.join(item_ids)}
         async with self.session.delete(url, headers=self.headers, params=params) as resp:
+            self._check_auth(resp)
             return resp.status == 204
 
     async def add_to_playlist(self, playlist_id: str, user_id: str, item_ids: list[str]) -> bool:
@@ -174,43 +260,200 @@ class JellyfinClient:
         url = f"{self.config.jellyfin_url}/Playlists/{playlist_id}/Items"
         params = {'userId': user_id, 'ids': ','.join(item_ids)}
         async with self.session.post(url, headers=self.headers, params=params) as resp:
+            self._check_auth(resp)
             return resp.status == 204
 
 
+class SimilarCache:
+    """Persistent SQLite cache of TMDB similar results, shared across runs."""
+
+    def __init__(self, path: str, ttl: int):
+        self.ttl = ttl
+        # Accessed from worker threads via asyncio.to_thread
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS similar ('
+            'tmdb_id INTEGER NOT NULL, '
+            'media_type TEXT NOT NULL, '
+            'results TEXT NOT NULL, '
+            'fetched_at REAL NOT NULL, '
+            'PRIMARY KEY (tmdb_id, media_type))'
+        )
+        self._conn.commit()
+
+    @classmethod
+    def open(cls, config: Config) -> Optional['SimilarCache']:
+        """Open the cache in the configured directory, or None if disabled/unavailable."""
+        if not config.cache_dir:
+            return None
+        try:
+            os.makedirs(config.cache_dir, exist_ok=True)
+            path = os.path.join(config.cache_dir, 'tmdb_similar.sqlite3')
+            return cls(path, config.cache_ttl_days * 86400)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"TMDB cache disabled, cannot open {config.cache_dir}: {e}")
+            return None
+
+    def get(self, tmdb_id: int, media_type: str) -> Optional[list[dict]]:
+        """Get cached results, or None if missing, expired or unreadable."""
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    'SELECT results, fetched_at FROM similar WHERE tmdb_id = ? AND media_type = ?',
+                    (tmdb_id, media_type)
+                ).fetchone()
+            if row and time.time() - row[1] < self.ttl:
+                return orjson.loads(row[0])
+        except (sqlite3.Error, orjson.JSONDecodeError) as e:
+            # The cache is best-effort (locked, full or corrupted DB); treat as a miss
+            logger.warning(f"TMDB cache read failed for {tmdb_id}: {e}")
+        return None
+
+    def set(self, tmdb_id: int, media_type: str, results: list[dict]):
+        """Store results for a title, skipping the write if the cache is unusable."""
+        try:
+            with self._lock:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO similar VALUES (?, ?, ?, ?)',
+                    (tmdb_id, media_type, orjson.dumps(results).decode(), time.time())
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"TMDB cache write failed for {tmdb_id}: {e}")
+
+    def close(self):
+        """Close the underlying database."""
+        with self._lock:
+            self._conn.close()
+
+
 class TMDbClient:
     """Client for interacting with TMDB API."""
 
     BASE_URL = "https://api.themoviedb.org/3"
+    # Stay under TMDB's ~50 req/s rate limit
+    MAX_REQUESTS_PER_SECOND = 40
 
-    def __init__(self, config: Config, session: aiohttp.ClientSession):
+    def __init__(self, config: Config, session: aiohttp.ClientSession,
+                 disk_cache: Optional[SimilarCache] = None):
         self.config = config
         self.session = session
+        self.disk_cache = disk_cache
+        # Earliest loop time the next request may start; in-flight requests are
+        # already capped by the session connector's limit_per_host
+        self._next_request_at = 0.0
+        # Pending/completed lookups shared across users for this run
+        self._cache: dict[tuple[int, str], asyncio.Future] = {}
 
     async def get_similar(self, tmdb_id: int, media_type: str) -> list[dict]:
-        """Get similar movies/shows from TMDB."""
+        """Get similar movies/shows from TMDB, fetching each title at most once."""
+        key = (tmdb_id, media_type)
+        if key in self._cache:
+            # Shield so a cancelled waiter doesn't cancel the shared lookup
+            return await asyncio.shield(self._cache[key])
+
+        fut = asyncio.get_running_loop().create_future()
+        self._cache[key] = fut
+        try:
+            candidates = await self._load_similar(tmdb_id, media_type)
+            try:
+                results = self._filter_similar(candidates)
+            except Exception as e:
+                # A malformed (possibly cached) row only costs this title
+                logger.error(f"Error filtering similar for {tmdb_id}: {e}")
+                results = []
+        except Exception as e:
+            # Don't cache the failure, but hand waiters the real error
+            del self._cache[key]
+            if not fut.done():
+                fut.set_exception(e)
+                fut.exception()  # The owner re-raises it; don't warn if no waiter retrieves it
+            raise
+        except BaseException:
+            # Don't cache or strand waiters on a cancelled fetch
+            del self._cache[key]
+            if not fut.done():
+                fut.cancel()
+            raise
+        if not fut.done():
+            fut.set_result(results)
+        return results
+
+    async def _load_similar(self, tmdb_id: int, media_type: str) -> list[dict]:
+        """Load unfiltered similar titles from the disk cache, falling back to TMDB."""
+        if self.disk_cache:
+            cached = await asyncio.to_thread(self.disk_cache.get, tmdb_id, media_type)
+            if cached is not None:
+                return cached
+
+        candidates = await self._fetch_similar(tmdb_id, media_type)
+        if candidates is None:
+            return []
+        if self.disk_cache:
+            await asyncio.to_thread(self.disk_cache.set, tmdb_id, media_type, candidates)
+        return candidates
+
+    async def _fetch_similar(self, tmdb_id: int, media_type: str,
+                             retry: bool = True) -> Optional[list[dict]]:
+        """Fetch similar movies/shows from the TMDB API, or None on failure."""
         endpoint = 'movie' if media_type == 'Movie' else 'tv'
         url = f"{self.BASE_URL}/{endpoint}/{tmdb_id}/similar"
         params = {'api_key': self.config.tmdb_api_key}
 
+        await self._throttle()
         try:
             async with self.session.get(url, params=params) as resp:
                 if resp.status == 200:
-                    data = await resp.json()
-                    results = []
-                    for item in data.get('results', [])[:self.config.max_similar_per_item]:
-                        vote_avg = item.get('vote_average', 0)
-                        vote_count = item.get('vote_count', 0)
-                        if vote_avg >= self.config.min_tmdb_rating and vote_count >= self.config.min_tmdb_votes:
-                            results.append({
-                                'id': item['id'],
-                                'title': item.get('title') or item.get('name'),
-                                'vote_average': vote_avg
-                            })
-                    return results
-                return []
+                    data = await read_json(resp)
+                    return [
+                        {
+                            'id': item['id'],
+                            'title': item.get('title') or item.get('name'),
+                            # TMDB may send null for either; store numbers so the cache stays filterable
+                            'vote_average': item.get('vote_average') or 0,
+                            'vote_count': item.get('vote_count') or 0
+                        }
+                        for item in data.get('results', [])
+                    ]
+                if resp.status != 429 or not retry:
+                    return None
+                retry_after = self._retry_after(resp)
         except Exception as e:
             logger.error(f"Error getting similar for {tmdb_id}: {e}")
-            return []
+            return None
+
+        # Rate limited: back off as instructed and retry once
+        logger.warning(f"TMDB rate limit hit for {tmdb_id}, retrying in {retry_after:.0f}s")
+        await asyncio.sleep(retry_after)
+        return await self._fetch_similar(tmdb_id, media_type, retry=False)
+
+    async def _throttle(self):
+        """Wait until this request's start slot so requests are paced evenly."""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        start = max(now, self._next_request_at)
+        self._next_request_at = start + 1 / self.MAX_REQUESTS_PER_SECOND
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    def _retry_after(self, resp: aiohttp.ClientResponse) -> float:
+        """Seconds to wait from a 429 response's Retry-After header, capped at the request timeout."""
+        try:
+            retry_after = max(float(resp.headers.get('Retry-After', '1')), 0.0)
+        except ValueError:
+            retry_after = 1.0
+        return min(retry_after, self.config.request_timeout)
+
+    def _filter_similar(self, candidates: list[dict]) -> list[dict]:
+        """Apply the configured per-item limit and rating thresholds."""
+        min_rating = self.config.min_tmdb_rating
+        min_votes = self.config.min_tmdb_votes
+        return [
+            {'id': item['id'], 'title': item['title'], 'vote_average': item['vote_average']}
+            for item in itertools.islice(candidates, self.config.max_similar_per_item)
+            if item['vote_average'] >= min_rating and item['vote_count'] >= min_votes
+        ]
 
 
 class PlaylistGenerator:
@@ -223,114 +466,134 @@ class PlaylistGenerator:
 
     async def run(self):
         """Main entry point to generate playlists for all users."""
-        timeout = aiohttp.ClientTimeout(total=self.config.request_timeout)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            self.jellyfin = JellyfinClient(self.config, session)
-            self.tmdb = TMDbClient(self.config, session)
-
-            # Get library content indexed by TMDB ID
-            logger.info("Fetching library content...")
-            movie_library = await self.jellyfin.get_library_items('Movie')
-            series_library = await self.jellyfin.get_library_items('Series')
-            logger.info(f"Found {len(movie_library)} movies and {len(series_library)} series in library")
-
-            # Process each user
-            users = await self.jellyfin.get_users()
-            logger.info(f"Processing {len(users)} users...")
-
-            for user in users:
-                await self.process_user(user, movie_library, series_library)
-
-    async def process_user(self, user: dict, movie_library: dict, series_library: dict):
+        disk_cache = SimilarCache.open(self.config)
+        try:
+            timeout = aiohttp.ClientTimeout(total=self.config.request_timeout)
+            # Keep idle connections long enough to be reused between phases of the run
+            connector = aiohttp.TCPConnector(
+                limit=100, limit_per_host=30, ttl_dns_cache=300, keepalive_timeout=60
+            )
+            async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+                self.jellyfin = JellyfinClient(self.config, session)
+                self.tmdb = TMDbClient(self.config, session, disk_cache)
+
+                # Get library content indexed by TMDB ID, and the users, concurrently.
+                # An auth error in any of them cancels the rest.
+                logger.info("Fetching library content...")
+                try:
+                    async with asyncio.TaskGroup() as tg:
+                        movie_task = tg.create_task(self.jellyfin.get_library_items('Movie'))
+                        series_task = tg.create_task(self.jellyfin.get_library_items('Series'))
+                        users_task = tg.create_task(self.jellyfin.get_users())
+                except ExceptionGroup as eg:
+                    # Surface the underlying cause, preferring an auth error
+                    raise (eg.subgroup(JellyfinAuthError) or eg).exceptions[0] from None
+                movie_library = movie_task.result()
+                series_library = series_task.result()
+                users = users_task.result()
+                logger.info(f"Found {len(movie_library)} movies and {len(series_library)} series in library")
+
+                # Process each user
+                logger.info(f"Processing {len(users)} users...")
+
+                sem = asyncio.Semaphore(self.config.max_user_concurrency)
+
+                async def process_with_limit(user: dict):
+                    async with sem:
+                        await self.process_user(user, movie_library, series_library)
+
+                # Let every user finish before the session closes; one user's
+                # failure shouldn't abort the others mid-update.
+                results = await asyncio.gather(
+                    *(process_with_limit(user) for user in users), return_exceptions=True
+                )
+                auth_error = None
+                for user, result in zip(users, results):
+                    if isinstance(result, JellyfinAuthError):
+                        auth_error = auth_error or result
+                    elif isinstance(result, BaseException):
+                        # Includes CancelledError, so an unwritten playlist is never silent
+                        logger.error(f"Failed to process user {user['Name']}: {result!r}")
+                if auth_error:
+                    raise auth_error
+        finally:
+            if disk_cache:
+                disk_cache.close()
+
+    async def process_user(self, user: dict, movie_library: dict[int, tuple[str, str]],
+                           series_library: dict[int, tuple[str, str]]):
         """Generate playlist for a single user."""
         user_id = user['Id']
         user_name = user['Name']
         logger.info(f"Processing user: {user_name}")
 
         # Get watched items
-        watched_movies = await self.jellyfin.get_watched_items(user_id, 'Movie')
-        watched_series = await self.jellyfin.get_watched_items(user_id, 'Episode')
+        watched_movies, watched_series = await asyncio.gather(
+            self.jellyfin.get_watched_items(user_id, 'Movie'),
+            self.jellyfin.get_watched_items(user_id, 'Episode')
+        )
 
         # Extract unique series from episodes
-        seen_series = set()
-        unique_series = []
-        for episode in watched_series:
-            series_id = episode.get('SeriesId')
-            if series_id and series_id not in seen_series:
-                seen_series.add(series_id)
-                # Get series info for TMDB ID
-                series_info = await self.get_series_info(user_id, series_id)
-                if series_info:
-                    unique_series.append(series_info)
+        jf_series_ids = list(dict.fromkeys(
+            episode['SeriesId'] for episode in watched_series if episode.get('SeriesId')
+        ))
+        # Fetch series info (for TMDB IDs) in one request, keeping watch order
+        series_by_id = {
+            series['Id']: series
+            for series in await self.jellyfin.get_items_by_ids(user_id, jf_series_ids, 'ProviderIds')
+        }
+        unique_series = [series_by_id[i] for i in jf_series_ids if i in series_by_id]
 
         logger.info(f"  Found {len(watched_movies)} watched movies, {len(unique_series)} watched series")
 
         # Find similar content
-        suggested_items = []
-        watched_tmdb_ids = set()
-
-        # Collect watched TMDB IDs to exclude
-        for movie in watched_movies:
-            tmdb_id = movie.get('ProviderIds', {}).get('Tmdb')
-            if tmdb_id:
-                watched_tmdb_ids.add(int(tmdb_id))
-
-        for series in unique_series:
-            tmdb_id = series.get('ProviderIds', {}).get('Tmdb')
-            if tmdb_id:
-                watched_tmdb_ids.add(int(tmdb_id))
-
-        # Get similar movies
-        for movie in watched_movies[:self.config.max_watched_items]:
-            tmdb_id = movie.get('ProviderIds', {}).get('Tmdb')
-            if tmdb_id:
-                similar = await self.tmdb.get_similar(int(tmdb_id), 'Movie')
-                for s in similar:
-                    if s['id'] in movie_library and s['id'] not in watched_tmdb_ids:
-                        jellyfin_item = movie_library[s['id']]
-                        if jellyfin_item['Id'] not in [i['Id'] for i in suggested_items]:
-                            suggested_items.append({
-                                'Id': jellyfin_item['Id'],
-                                'Name': jellyfin_item['Name'],
-                                'Type': 'Movie',
-                                'Score': s['vote_average']
-                            })
-
-        # Get similar series
-        for series in unique_series[:self.config.max_watched_items]:
-            tmdb_id = series.get('ProviderIds', {}).get('Tmdb')
-            if tmdb_id:
-                similar = await self.tmdb.get_similar(int(tmdb_id), 'Series')
-                for s in similar:
-                    if s['id'] in series_library and s['id'] not in watched_tmdb_ids:
-                        jellyfin_item = series_library[s['id']]
-                        if jellyfin_item['Id'] not in [i['Id'] for i in suggested_items]:
-                            suggested_items.append({
-                                'Id': jellyfin_item['Id'],
-                                'Name': jellyfin_item['Name'],
-                                'Type': 'Series',
-                                'Score': s['vote_average']
-                            })
-
-        # Sort by TMDB score and limit
-        suggested_items.sort(key=lambda x: x['Score'], reverse=True)
-        suggested_items = suggested_items[:self.config.max_playlist_items]
+        candidates: list[Suggestion] = []
+        added_ids: set[str] = set()
+
+        # Collect watched TMDB IDs, used both as similarity seeds and to exclude
+        watched_movie_ids = [i for i in map(get_tmdb_id, watched_movies) if i is not None]
+        watched_series_ids = [i for i in map(get_tmdb_id, unique_series) if i is not None]
+        watched_tmdb_ids = {*watched_movie_ids, *watched_series_ids}
+
+        # Get similar content for all watched items concurrently
+        movie_seed_ids = watched_movie_ids[:self.config.max_watched_items]
+        series_seed_ids = watched_series_ids[:self.config.max_watched_items]
+        similar_movies, similar_series = await asyncio.gather(
+            asyncio.gather(*(self.tmdb.get_similar(i, 'Movie') for i in movie_seed_ids)),
+            asyncio.gather(*(self.tmdb.get_similar(i, 'Series') for i in series_seed_ids)),
+        )
+
+        self._collect_similar(similar_movies, movie_library, 'Movie',
+                              watched_tmdb_ids, added_ids, candidates)
+        self._collect_similar(similar_series, series_library, 'Series',
+                              watched_tmdb_ids, added_ids, candidates)
+
+        # Pick the top candidates by TMDB score
+        suggested_items = heapq.nlargest(
+            self.config.max_playlist_items, candidates, key=operator.attrgetter('score')
+        )
 
         logger.info(f"  Found {len(suggested_items)} suggestions")
 
         if suggested_items:
             await self.update_playlist(user_id, user_name, suggested_items)
 
-    async def get_series_info(self, user_id: str, series_id: str) -> Optional[dict]:
-        """Get series info including provider IDs."""
-        url = f"{self.config.jellyfin_url}/Items/{series_id}"
-        params = {'userId': user_id, 'fields': 'ProviderIds'}
-        async with self.jellyfin.session.get(url, headers=self.jellyfin.headers, params=params) as resp:
-            if resp.status == 200:
-                return await resp.json()
-            return None
-
-    async def update_playlist(self, user_id: str, user_name: str, items: list[dict]):
+    @staticmethod
+    def _collect_similar(similar_lists: list[list[dict]], library: dict[int, tuple[str, str]],
+                         media_type: str, watched_tmdb_ids: set[int], added_ids: set[str],
+                         candidates: list[Suggestion]):
+        """Append unwatched similar titles that exist in the library to candidates."""
+        for similar in similar_lists:
+            for s in similar:
+                if s['id'] in library and s['id'] not in watched_tmdb_ids:
+                    jf_id, jf_name = library[s['id']]
+                    if jf_id not in added_ids:
+                        added_ids.add(jf_id)
+                        candidates.append(Suggestion(
+                            id=jf_id, name=jf_name, type=media_type, score=s['vote_average']
+                        ))
+
+    async def update_playlist(self, user_id: str, user_name: str, items: list[Suggestion]):
         """Create or update the suggestions playlist for a user."""
         playlist_name = self.config.playlist_name
         playlists = await self.jellyfin.get_user_playlists(user_id)
@@ -342,27 +605,39 @@ class PlaylistGenerator:
                 existing_playlist = p
                 break
 
-        item_ids = [item['Id'] for item in items]
+        item_ids = [item.id for item in items]
 
         if existing_playlist:
             playlist_id = existing_playlist['Id']
             logger.info(f"  Updating existing playlist for {user_name}")
 
-            # Get current items and clear them
+            # Only remove/add the items that changed since the last run. Entries
+            # for an item already kept earlier in the playlist are duplicates.
             current_items = await self.jellyfin.get_playlist_items(playlist_id, user_id)
-            if current_items:
-                entry_ids = [item['PlaylistItemId'] for item in current_items]
-                await self.jellyfin.clear_playlist(playlist_id, entry_ids)
-
-            # Add new items
-            await self.jellyfin.add_to_playlist(playlist_id, user_id, item_ids)
+            new_id_set = set(item_ids)
+            kept_ids = set()
+            to_remove = []
+            for entry in current_items:
+                if entry['Id'] in new_id_set and entry['Id'] not in kept_ids:
+                    kept_ids.add(entry['Id'])
+                else:
+                    to_remove.append(entry['PlaylistItemId'])
+            to_add = [item_id for item_id in item_ids if item_id not in kept_ids]
+
+            if to_remove or to_add:
+                await self.jellyfin.clear_playlist(playlist_id, to_remove)
+                await self.jellyfin.add_to_playlist(playlist_id, user_id, to_add)
+                logger.info(f"  Playlist updated: removed {len(to_remove)}, added {len(to_add)} items")
+            else:
+                logger.info("  Playlist already up to date")
         else:
             logger.info(f"  Creating new playlist for {user_name}")
             await self.jellyfin.create_playlist(user_id, playlist_name, item_ids)
+            logger.info(f"  Playlist created with {len(items)} items")
 
-        logger.info(f"  Playlist updated with {len(items)} items")
+        logger.info("  Top suggestions:")
         for item in items[:5]:
-            logger.info(f"    - {item['Name']} ({item['Type']}, score: {item['Score']:.1f})")
+            logger.info(f"    - {item.name} ({item.type}, score: {item.score:.1f})")
         if len(items) > 5:
             logger.info(f"    ... and {len(items) - 5} more")
 
@@ -379,7 +654,7 @@ async def main():
         generator = PlaylistGenerator(config)
         await generator.run()
         logger.info("Completed successfully!")
-    except ValueError as e:
+    except (ValueError, JellyfinAuthError) as e:
         logger.error(str(e))
         raise SystemExit(1)
     except Exception as e: